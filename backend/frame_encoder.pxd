@@ -0,0 +1,6 @@
+# Cython declarations for frame_encoder.py - only used when compiling it
+# (python setup.py build_ext --inplace), the .py stays plain Python
+cimport cython
+
+@cython.locals(n=Py_ssize_t, i=Py_ssize_t, marker=cython.uchar, segment_length=Py_ssize_t)
+cpdef _jpeg_dimensions(const unsigned char[:] jpeg_bytes)
@@ -1,42 +1,91 @@
 import asyncio
-import base64
-import io
+import collections
+import concurrent.futures
+import functools
+import operator
 import os
-import cv2
-import PIL.Image
-import numpy as np
 import logging
-from typing import AsyncGenerator, Dict, Any
+from typing import AsyncGenerator, Dict, Any, Optional
 from google import genai
-from google.genai.types import Content, Part
+# b64decode is pybase64's when installed, see frame_encoder
+from frame_encoder import b64decode, encode_frame
 
 logger = logging.getLogger(__name__)
 
+# Configuration exactly matching your working code
+CREDENTIALS_PATH = './credentials.json'
+GOOGLE_CLOUD_PROJECT = "dochq-staging"
+GOOGLE_CLOUD_LOCATION = "us-central1"
+
+# Frames encoded concurrently - further frames are skipped while all are busy
+ENCODE_SLOTS = 2
+
+# PCM chunks buffered for sending - the oldest is dropped when full
+AUDIO_BUFFER_CHUNKS = 64
+
+# PCM bytes coalesced into one send - 100 ms of 16 kHz 16-bit mono audio
+AUDIO_COALESCE_BYTES = 3200
+
+# Longest we hold a partial audio batch waiting for the next chunk (seconds)
+AUDIO_COALESCE_WAIT = 0.02
+
+# Most queued responses handed out per wake-up of get_responses
+RESPONSE_BATCH_SIZE = 16
+
+# Longest a pooled session waits for a connection before it is replaced -
+# well inside the Live API's session time limit, which runs from connect
+POOL_MAX_IDLE = 60.0
+
+# Longest startup waits for the pool's first handshakes (seconds)
+POOL_WARMUP_TIMEOUT = 10.0
+
+# (response attribute, outgoing key, log message) for everything we forward
+_RESPONSE_FIELDS = (
+    ("text", "text", "Received text response: %.100s..."),
+    ("data", "audio", None),
+    ("output_transcription", "transcription", "AI speech transcription: %s"),
+    ("input_transcription", "user_transcription", "User speech transcription: %s"),
+)
+
+def _tuple_attrgetter(names):
+    """operator.attrgetter that always returns a tuple, even for zero or one names"""
+    if not names:
+        return lambda obj: ()
+    if len(names) == 1:
+        getter = operator.attrgetter(names[0])
+        return lambda obj: (getter(obj),)
+    return operator.attrgetter(*names)
+
+def create_client() -> genai.Client:
+    """Load credentials and create a Gemini client - one can serve many sessions"""
+    # Check for credentials
+    if os.path.exists(CREDENTIALS_PATH):
+        os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = CREDENTIALS_PATH
+        logger.info("Credentials loaded successfully")
+    else:
+        raise RuntimeError(f"Credentials file not found at {CREDENTIALS_PATH}")
+    
+    # Initialize client exactly like working code
+    try:
+        client = genai.Client(
+            vertexai=True,
+            project=GOOGLE_CLOUD_PROJECT,
+            location=GOOGLE_CLOUD_LOCATION,
+        )
+        logger.info("Gemini client initialized successfully")
+        return client
+    except Exception as e:
+        logger.error("Failed to initialize Gemini client: %s", e)
+        raise
+
 class GeminiVideoChat:
-    def __init__(self):
-        # Configuration exactly matching your working code
-        CREDENTIALS_PATH = './credentials.json'
-        self.GOOGLE_CLOUD_PROJECT = "dochq-staging"
-        self.GOOGLE_CLOUD_LOCATION = "us-central1"
+    def __init__(self, client: Optional[genai.Client] = None):
+        self.GOOGLE_CLOUD_PROJECT = GOOGLE_CLOUD_PROJECT
+        self.GOOGLE_CLOUD_LOCATION = GOOGLE_CLOUD_LOCATION
         
-        # Check for credentials
-        if os.path.exists(CREDENTIALS_PATH):
-            os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = CREDENTIALS_PATH
-            logger.info("Credentials loaded successfully")
-        else:
-            raise RuntimeError(f"Credentials file not found at {CREDENTIALS_PATH}")
-        
-        # Initialize client exactly like working code
-        try:
-            self.client = genai.Client(
-                vertexai=True,
-                project=self.GOOGLE_CLOUD_PROJECT,
-                location=self.GOOGLE_CLOUD_LOCATION,
-            )
-            logger.info("Gemini client initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize Gemini client: {e}")
-            raise
+        # Sessions can share one client (see GeminiPool), otherwise each
+        # creates its own
+        self.client = create_client() if client is None else client
         
         # Configuration exactly matching your working code
         self.MODEL = "gemini-2.0-flash-live-preview-04-09"
@@ -47,10 +96,30 @@ class GeminiVideoChat:
         # Session management
         self.session = None
         self.response_queue = asyncio.Queue()
-        self.out_queue = None
+        self._audio_chunks = collections.deque(maxlen=AUDIO_BUFFER_CHUNKS)
+        self._audio_ready = None
+        self._pcm_buffer = bytearray()  # Coalescing buffer, reused per send
+        self._video_slot = None  # Newest encoded frame, older ones are dropped
+        self._video_ready = None
         self.is_active = False
         self._response_task = None
         self._send_task = None
+        
+        # _RESPONSE_FIELDS narrowed to what the current response type has
+        self._response_type = None
+        self._response_fields = ()
+        self._get_response_values = _tuple_attrgetter(())
+        
+        # Checked once - skips building debug records on the per-frame paths
+        self._debug = logger.isEnabledFor(logging.DEBUG)
+        
+        # Frame decode/resize/encode runs here, off the event loop
+        self._cpu_pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=ENCODE_SLOTS, thread_name_prefix="frame-encoder"
+        )
+        self._encodes_in_flight = 0
+        self._frame_seq = 0  # Sequence number of the last frame dispatched
+        self._slot_seq = 0  # Sequence number of the frame in _video_slot
     
     async def start_session(self):
         """Start the Gemini session"""
@@ -63,7 +132,11 @@ class GeminiVideoChat:
             self.session = await self._session_context.__aenter__()
             
             self.is_active = True
-            self.out_queue = asyncio.Queue(maxsize=5)  # Same as your working code
+            # Audio must stream continuously, video only needs the newest frame
+            self._audio_chunks.clear()
+            self._audio_ready = asyncio.Event()
+            self._video_slot = None
+            self._video_ready = asyncio.Event()
             
             # Start response listener
             self._response_task = asyncio.create_task(self._listen_responses())
@@ -74,11 +147,13 @@ class GeminiVideoChat:
             logger.info("Gemini session started successfully")
             
         except Exception as e:
-            logger.error(f"Failed to start Gemini session: {e}")
+            logger.error("Failed to start Gemini session: %s", e)
             raise
     
     async def _listen_responses(self):
         """Listen for responses from Gemini - matching your working code structure"""
+        # Bound once - these are hit for every streamed response
+        put = self.response_queue.put
         try:
             while self.is_active and self.session:
                 try:
@@ -87,31 +162,38 @@ class GeminiVideoChat:
                         if not self.is_active:  # Check if we're still active
                             break
                             
-                        response_data = {}
-                        
-                        # Handle text responses
-                        if hasattr(response, 'text') and response.text:
-                            response_data['text'] = response.text
-                            logger.info(f"Received text response: {response.text[:100]}...")
+                        # The response shape is fixed per type, so only look up
+                        # the attributes it actually has
+                        if type(response) is not self._response_type:
+                            self._response_type = type(response)
+                            self._response_fields = tuple(
+                                field for field in _RESPONSE_FIELDS if hasattr(response, field[0])
+                            )
+                            self._get_response_values = _tuple_attrgetter(
+                                [attr for attr, _, _ in self._response_fields]
+                            )
                         
-                        # Handle audio responses - same as your working code
-                        if hasattr(response, 'data') and response.data:
-                            response_data['audio'] = base64.b64encode(response.data).decode()
-                            logger.info("Received audio response")
+                        # Fetch every field in one C-level call
+                        try:
+                            values = self._get_response_values(response)
+                        except AttributeError:
+                            values = [getattr(response, attr, None) for attr, _, _ in self._response_fields]
                         
-                        # Handle transcriptions - matching your working code
-                        if hasattr(response, 'output_transcription') and response.output_transcription:
-                            response_data['transcription'] = response.output_transcription
-                            logger.info(f"AI speech transcription: {response.output_transcription}")
+                        # Handle text, audio and transcriptions - same as your working code
+                        response_data = {}
+                        for (attr, key, log_message), value in zip(self._response_fields, values):
+                            if value:
+                                response_data[key] = value
+                                if log_message:
+                                    logger.info(log_message, value)
                         
-                        # Handle input transcriptions (what the user said)
-                        if hasattr(response, 'input_transcription') and response.input_transcription:
-                            response_data['user_transcription'] = response.input_transcription
-                            logger.info(f"User speech transcription: {response.input_transcription}")
+                        # Audio stays raw PCM bytes - main.py sends it as a binary frame
+                        if self._debug and 'audio' in response_data:
+                            logger.debug("Received audio response")
                         
                         # Send response if we have data
                         if response_data:
-                            await self.response_queue.put(response_data)
+                            await put(response_data)
                     
                     # If we reach here, the turn ended normally
                     if not self.is_active:
@@ -126,34 +208,85 @@ class GeminiVideoChat:
                         logger.info("Gemini session disconnected")
                         self.is_active = False
                         break
-                    logger.error(f"Error in response listener: {e}")
+                    logger.error("Error in response listener: %s", e)
                     await asyncio.sleep(1)  # Brief pause before retrying
                         
         except Exception as e:
-            logger.error(f"Critical error in response listener: {e}")
+            logger.error("Critical error in response listener: %s", e)
         finally:
             self.is_active = False  # Ensure we're marked as inactive
             logger.info("Response listener stopped")
     
     async def _send_realtime(self):
-        """Send realtime data to Gemini - matching your working code"""
+        """Send realtime data to Gemini - audio first, then the newest video frame"""
+        audio_wait = None
+        video_wait = None
+        # Bound once - these are hit for every chunk and frame sent
+        send = self.session.send
+        chunks = self._audio_chunks
+        audio_ready = self._audio_ready
+        pcm = self._pcm_buffer
         try:
             while self.is_active and self.session:
                 try:
-                    # Wait for new items in queue with timeout
-                    msg = await asyncio.wait_for(self.out_queue.get(), timeout=1.0)
+                    if audio_wait is None:
+                        audio_wait = asyncio.ensure_future(audio_ready.wait())
+                    if video_wait is None:
+                        video_wait = asyncio.ensure_future(self._video_ready.wait())
+                    
+                    # Wait for audio or a new video frame with timeout
+                    done, _ = await asyncio.wait(
+                        {audio_wait, video_wait},
+                        timeout=1.0,
+                        return_when=asyncio.FIRST_COMPLETED
+                    )
                     
                     # Check if still active before sending
+                    if not done:
+                        continue
                     if not self.is_active:
                         break
                     
-                    # Send to Gemini using the same method as your working code
-                    await self.session.send(input=msg)
-                    logger.debug("Sent message to Gemini")
+                    # Send audio first so it never waits behind a video frame,
+                    # coalescing small PCM chunks into a single send
+                    if audio_wait in done:
+                        audio_wait = None
+                        audio_ready.clear()
+                        pcm.clear()
+                        while len(pcm) < AUDIO_COALESCE_BYTES:
+                            if chunks:
+                                pcm += chunks.popleft()
+                                continue
+                            if not pcm:
+                                break
+                            try:
+                                await asyncio.wait_for(
+                                    audio_ready.wait(), timeout=AUDIO_COALESCE_WAIT
+                                )
+                            except asyncio.TimeoutError:
+                                break
+                            audio_ready.clear()
+                        
+                        # Come back for anything left over after this batch
+                        if chunks:
+                            audio_ready.set()
+                        
+                        if pcm:
+                            # The SDK gets its own bytes - the buffer is reused
+                            await send(input={"data": bytes(pcm), "mime_type": "audio/pcm"})
+                            if self._debug:
+                                logger.debug("Sent audio to Gemini")
+                    
+                    # Only send video when the slot actually changed
+                    if video_wait in done:
+                        video_wait = None
+                        self._video_ready.clear()
+                        frame, self._video_slot = self._video_slot, None
+                        if frame is not None:
+                            await send(input=frame)
+                            if self._debug:
+                                logger.debug("Sent video frame to Gemini")
                     
-                except asyncio.TimeoutError:
-                    # Continue if no messages in queue
-                    continue
                 except asyncio.CancelledError:
                     logger.info("Send realtime cancelled")
                     break
@@ -163,91 +296,96 @@ class GeminiVideoChat:
                         logger.info("Gemini session disconnected in send")
                         self.is_active = False
                         break
-                    logger.error(f"Error in send realtime: {e}")
+                    logger.error("Error in send realtime: %s", e)
                     await asyncio.sleep(0.1)
                     
         except Exception as e:
-            logger.error(f"Critical error in send realtime: {e}")
+            logger.error("Critical error in send realtime: %s", e)
         finally:
+            for waiter in (audio_wait, video_wait):
+                if waiter is not None:
+                    waiter.cancel()
             self.is_active = False  # Ensure we're marked as inactive
             logger.info("Send realtime stopped")
     
-    async def send_video_frame(self, frame_data: bytes):
+    async def send_video_frame(self, frame_data):
         """Send video frame to Gemini - matching your working code structure"""
         if not self.session or not self.is_active:
-            logger.debug("Session not active, cannot send video frame")
+            if self._debug:
+                logger.debug("Session not active, cannot send video frame")
             return
             
-        try:
-            # Frame data is already base64 JPEG from frontend
-            # Decode it to get raw JPEG bytes
-            jpeg_bytes = base64.b64decode(frame_data)
-            
-            # For compatibility with working code, process the image
-            nparr = np.frombuffer(jpeg_bytes, np.uint8)
-            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
-            if frame is None:
-                logger.warning("Failed to decode video frame")
-                return
-            
-            # Convert BGR to RGB - same as your working code
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            # Resize and encode - same as your working code
-            img = PIL.Image.fromarray(frame_rgb)
-            img.thumbnail([1024, 1024])  # Same size as your working code
-            
-            # Convert to JPEG - same format as your working code
-            image_io = io.BytesIO()
-            img.save(image_io, format="jpeg")
-            image_io.seek(0)
-            
-            # Prepare for sending - exact same format as your working code
-            image_bytes = image_io.read()
-            frame_data_dict = {
-                "mime_type": "image/jpeg",
-                "data": base64.b64encode(image_bytes).decode()
-            }
+        if self._encodes_in_flight >= ENCODE_SLOTS:
+            if self._debug:
+                logger.debug("All encode slots busy, skipping video frame")
+            return
             
-            # Put in queue instead of sending directly - matching your working code flow
-            try:
-                self.out_queue.put_nowait(frame_data_dict)
-                logger.debug("Video frame queued successfully")
-            except asyncio.QueueFull:
-                logger.debug("Video frame queue full, skipping frame")
+        try:
+            # Decoding/encoding is CPU-bound, keep it off the event loop. Don't
+            # wait for it either - the next frame encodes while this one is
+            # still being sent
+            self._frame_seq += 1
+            future = asyncio.get_running_loop().run_in_executor(
+                self._cpu_pool, encode_frame, frame_data
+            )
+            self._encodes_in_flight += 1
+            future.add_done_callback(functools.partial(self._on_frame_encoded, self._frame_seq))
             
         except Exception as e:
-            logger.error(f"Error sending video frame: {e}")
+            logger.error("Error sending video frame: %s", e)
+    
+    def _on_frame_encoded(self, seq, future):
+        """Put a finished frame in the video slot (runs on the event loop)"""
+        self._encodes_in_flight -= 1
+        if future.cancelled() or not self.is_active:
+            return
+        if future.exception() is not None:
+            logger.error("Error encoding video frame: %s", future.exception())
+            return
+        
+        frame_data_dict = future.result()
+        if frame_data_dict is None:
+            logger.warning("Failed to decode video frame")
+            return
+        
+        # A newer frame finished first - this one is already stale
+        if seq < self._slot_seq:
+            return
+        
+        # Overwrite any frame not sent yet - a stale frame is worthless
+        self._slot_seq = seq
+        self._video_slot = frame_data_dict
+        self._video_ready.set()
+        if self._debug:
+            logger.debug("Video frame queued successfully")
     
     async def send_audio_data(self, audio_data):
         """Send audio data to Gemini - matching your working code exactly"""
         if not self.session or not self.is_active:
-            logger.debug("Session not active, cannot send audio data")
+            if self._debug:
+                logger.debug("Session not active, cannot send audio data")
             return
             
         try:
-            # Decode base64 audio data from frontend - PCM 16-bit data
+            # Decode base64 audio data from frontend - PCM 16-bit data. Binary
+            # frames arrive as memoryview slices and are only copied once,
+            # into the coalescing buffer
             if isinstance(audio_data, str):
-                audio_bytes = base64.b64decode(audio_data)
+                audio_bytes = b64decode(audio_data)
             else:
                 audio_bytes = audio_data
             
-            # Prepare audio message - exact same format as your working code
-            audio_message = {
-                "data": audio_bytes,  # Raw PCM bytes, not base64 encoded
-                "mime_type": "audio/pcm"
-            }
-            
-            # Put in queue instead of sending directly - matching your working code flow
-            try:
-                self.out_queue.put_nowait(audio_message)
-                logger.debug(f"Audio data queued successfully, {len(audio_bytes)} bytes")
-            except asyncio.QueueFull:
-                logger.debug("Audio queue full, skipping audio chunk")
+            # Buffer raw PCM bytes instead of sending directly - the sender
+            # wraps them in an audio/pcm message like your working code
+            if self._debug and len(self._audio_chunks) == self._audio_chunks.maxlen:
+                logger.debug("Audio buffer full, dropping oldest audio chunk")
+            self._audio_chunks.append(audio_bytes)
+            self._audio_ready.set()
+            if self._debug:
+                logger.debug("Audio data queued successfully, %d bytes", len(audio_bytes))
             
         except Exception as e:
-            logger.error(f"Error sending audio data: {e}")
+            logger.error("Error sending audio data: %s", e)
     
     async def send_text(self, text: str):
         """Send text message to Gemini"""
@@ -258,21 +396,30 @@ class GeminiVideoChat:
         try:
             # Send text directly like in your working code
             await self.session.send(input=text, end_of_turn=True)
-            logger.info(f"Text message sent: {text}")
+            logger.info("Text message sent: %s", text)
             
         except Exception as e:
-            logger.error(f"Error sending text message: {e}")
+            logger.error("Error sending text message: %s", e)
     
     async def get_responses(self) -> AsyncGenerator[Dict[str, Any], None]:
         """Generator for responses"""
+        queue = self.response_queue
         while self.is_active:
             try:
                 # Wait for response with timeout
                 response = await asyncio.wait_for(
-                    self.response_queue.get(), 
+                    queue.get(), 
                     timeout=30.0
                 )
-                yield response
+                
+                # Streaming is bursty - take whatever else is already queued
+                # so the timer is armed once per batch, not per response
+                batch = [response]
+                while len(batch) < RESPONSE_BATCH_SIZE and not queue.empty():
+                    batch.append(queue.get_nowait())
+                
+                for response in batch:
+                    yield response
                 
             except asyncio.TimeoutError:
                 # Continue waiting
@@ -280,7 +427,7 @@ class GeminiVideoChat:
                 continue
                 
             except Exception as e:
-                logger.error(f"Error getting response: {e}")
+                logger.error("Error getting response: %s", e)
                 break
     
     async def cleanup(self):
@@ -304,23 +451,23 @@ class GeminiVideoChat:
             except asyncio.CancelledError:
                 pass
         
+        # Stop frame encoding, dropping frames that never started
+        self._cpu_pool.shutdown(wait=False, cancel_futures=True)
+        
         # Close session
         if self.session and hasattr(self, '_session_context'):
             try:
                 await self._session_context.__aexit__(None, None, None)
                 logger.info("Gemini session closed successfully")
             except Exception as e:
-                logger.error(f"Error closing Gemini session: {e}")
+                logger.error("Error closing Gemini session: %s", e)
             finally:
                 self.session = None
                 self._session_context = None
         
         # Clear queues
-        while self.out_queue and not self.out_queue.empty():
-            try:
-                self.out_queue.get_nowait()
-            except asyncio.QueueEmpty:
-                break
+        self._audio_chunks.clear()
+        self._video_slot = None
         
         while not self.response_queue.empty():
             try:
@@ -330,10 +477,130 @@ class GeminiVideoChat:
         
         logger.info("Cleanup completed")
 
+class GeminiPool:
+    """Gemini sessions started ahead of time, so a new connection skips the handshake"""
+    
+    def __init__(self, size: int, client: Optional[genai.Client] = None,
+                 max_idle: float = POOL_MAX_IDLE, warmup_timeout: float = POOL_WARMUP_TIMEOUT):
+        self.size = size
+        self.client = client
+        self.max_idle = max_idle
+        self.warmup_timeout = warmup_timeout
+        # Parked sessions, oldest first, with the timer that evicts each one
+        self._parked: Dict[GeminiVideoChat, asyncio.TimerHandle] = {}
+        self._refills = set()
+        self._cleanups = set()
+    
+    async def warmup(self):
+        """Create the shared client and start filling the pool - never fails startup"""
+        if self.client is None:
+            try:
+                self.client = create_client()
+            except Exception as e:
+                # Connections fall back to creating their own client
+                logger.error("No shared Gemini client, pool not warmed: %s", e)
+                return
+        
+        for _ in range(self.size):
+            self._schedule_refill()
+        if not self._refills:
+            return
+        
+        # Give the handshakes a bounded head start - any still running keep
+        # going in the background and park when they finish
+        await asyncio.wait(set(self._refills), timeout=self.warmup_timeout)
+        logger.info("Gemini pool warmed with %d of %d sessions", len(self._parked), self.size)
+    
+    async def _refill(self):
+        """Start one session and park it in the pool"""
+        chat = None
+        try:
+            chat = GeminiVideoChat(client=self.client)
+            await chat.start_session()
+        except Exception as e:
+            logger.error("Failed to pre-warm Gemini session: %s", e)
+            if chat is not None:
+                await chat.cleanup()
+            return
+        if self.size == 0:
+            # Pool closed while this session was connecting
+            await chat.cleanup()
+            return
+        self._park(chat)
+    
+    def _park(self, chat: GeminiVideoChat):
+        """Hold a started session until it is handed out, dies, or gets too old"""
+        # A Live session's time limit runs from connect, so a parked session
+        # is only worth handing out while most of it is left
+        loop = asyncio.get_running_loop()
+        self._parked[chat] = loop.call_later(self.max_idle, self._evict, chat)
+        chat._response_task.add_done_callback(lambda _: self._evict(chat))
+    
+    def _evict(self, chat: GeminiVideoChat):
+        """Drop a parked session that expired or whose listener stopped, and replace it"""
+        expiry = self._parked.pop(chat, None)
+        if expiry is None:
+            return  # Already handed out
+        expiry.cancel()
+        self._spawn(self._cleanups, chat.cleanup())
+        self._schedule_refill()
+    
+    def _spawn(self, tasks: set, coro):
+        """Run coro in a task kept alive by tasks until it finishes"""
+        task = asyncio.create_task(coro)
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    
+    def _schedule_refill(self):
+        """Top the pool back up in the background"""
+        # Without the shared client (warmup failed) connections start their
+        # own sessions, as without a pool
+        if self.client is None:
+            return
+        if len(self._parked) + len(self._refills) >= self.size:
+            return
+        self._spawn(self._refills, self._refill())
+    
+    async def acquire(self) -> GeminiVideoChat:
+        """Hand out a started session - a warm one if available"""
+        try:
+            while self._parked:
+                chat = next(iter(self._parked))
+                self._parked.pop(chat).cancel()
+                if chat.is_active:
+                    return chat
+                # Went away while parked (e.g. the server closed it)
+                await chat.cleanup()
+            
+            # Pool is empty - start one on the spot
+            chat = GeminiVideoChat(client=self.client)
+            try:
+                await chat.start_session()
+            except Exception:
+                await chat.cleanup()
+                raise
+            return chat
+        finally:
+            self._schedule_refill()
+    
+    async def release(self, chat: GeminiVideoChat):
+        """Finish with a session - sessions carry conversation state, so they are never reused"""
+        await chat.cleanup()
+    
+    async def close(self):
+        """Stop refilling and close every parked session"""
+        self.size = 0
+        await asyncio.gather(*self._refills, return_exceptions=True)
+        while self._parked:
+            chat, expiry = self._parked.popitem()
+            expiry.cancel()
+            await chat.cleanup()
+        await asyncio.gather(*self._cleanups, return_exceptions=True)
+
 # Test function matching your working code style
-async def test_gemini_client():
+async def test_gemini_client(gemini: Optional[genai.Client] = None):
     """Test function to verify Gemini client functionality"""
-    client = GeminiVideoChat()
+    client = GeminiVideoChat(client=gemini)
     
     try:
         await client.start_session()
@@ -349,9 +616,15 @@ async def test_gemini_client():
         
     except Exception as e:
         print(f"❌ Gemini client test failed: {e}")
+        raise  # Let callers like /test see the failure
     finally:
         await client.cleanup()
 
 if __name__ == "__main__":
-    # Run test
-    asyncio.run(test_gemini_client())
\ No newline at end of file
+    # Run test - on uvloop when it is installed
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(test_gemini_client())
+    else:
+        uvloop.run(test_gemini_client())
\ No newline at end of file
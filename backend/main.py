@@ -1,157 +1,443 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 import asyncio
-import json
-import base64
+import os
+import msgspec
+import orjson
 import logging
-import traceback
-from gemini_client import GeminiVideoChat
+import logging.handlers
+import queue
+import atexit
+from typing import Any
+from weakref import WeakValueDictionary
+from gemini_client import GeminiPool, test_gemini_client
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging - records are handed to a listener thread, so stream
+# writes never block the event loop
+_log_queue = queue.SimpleQueue()
+logging.basicConfig(level=logging.INFO, handlers=[logging.handlers.QueueHandler(_log_queue)])
+_log_listener = logging.handlers.QueueListener(_log_queue, logging.StreamHandler())
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Video Chat API", version="1.0.0")
+app = FastAPI(
+    title="Video Chat API",
+    version="1.0.0",
+    default_response_class=ORJSONResponse
+)
+
+# Allowed CORS origins - comma separated in CORS_ORIGINS, defaulting to
+# the local dev servers
+CORS_ORIGINS = [
+    origin.strip()
+    for origin in os.environ.get(
+        "CORS_ORIGINS",
+        "http://localhost:5173,http://127.0.0.1:5173,http://localhost:3000,http://127.0.0.1:3000"
+    ).split(",")
+    if origin.strip()
+]
+
+class OriginSetCORSMiddleware(CORSMiddleware):
+    """CORSMiddleware checking origins against a frozenset instead of a list"""
+    
+    def __init__(self, app, **kwargs):
+        super().__init__(app, **kwargs)
+        self._allowed_origins = frozenset(self.allow_origins)
+    
+    def is_allowed_origin(self, origin: str) -> bool:
+        if self.allow_all_origins:
+            return True
+        if self.allow_origin_regex is not None and self.allow_origin_regex.fullmatch(origin):
+            return True
+        return origin in self._allowed_origins
 
 # Enable CORS
 app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        "http://localhost:5173", 
-        "http://127.0.0.1:5173",
-        "http://localhost:3000", 
-        "http://127.0.0.1:3000"
-    ],
+    OriginSetCORSMiddleware,
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "OPTIONS"],
+    allow_headers=["content-type", "authorization"],
 )
 
-# Store active connections
-active_connections = {}
+# Opcodes in the first byte of binary WebSocket frames from the client,
+# the rest of the frame is the raw payload - must match VideoChat.jsx
+VIDEO_FRAME_OPCODE = 0x01  # JPEG bytes
+AUDIO_DATA_OPCODE = 0x02  # 16-bit PCM bytes
+PING_OPCODE = 0x50  # b"P" + little-endian uint64 timestamp, echoed back
+
+# Prefix of binary frames to the client carrying Gemini's 24 kHz PCM audio
+AUDIO_RESPONSE_PREFIX = b"\x10"
+# Prefix of the binary pong answering a binary ping
+PONG_PREFIX = b"p"
+
+# Most outbound frames the writer drains per wakeup - consecutive JSON
+# envelopes among them share a single newline-delimited text frame
+OUTBOUND_BATCH_SIZE = 16
+
+# Outbound frames held for a slow client. Gemini responses wait for room in
+# their queue and are never dropped; control envelopes (pongs, errors) and
+# binary frames (audio, pongs) past their limits drop the oldest of their
+# own kind, so playback stays current instead of falling ever further behind
+OUTBOUND_QUEUE_SIZE = 64
+OUTBOUND_CONTROL_SIZE = 8
+OUTBOUND_BINARY_FRAMES = 32
+
+# Inbound payloads waiting for Gemini. Video frames past the limit drop the
+# oldest, since only the newest matters; typed text is never dropped - the
+# read loop waits for room instead. Audio needs no queue, send_audio_data
+# never blocks and its own buffer already drops the oldest chunk
+VIDEO_QUEUE_SIZE = 4
+TEXT_QUEUE_SIZE = 16
+
+# Invalid messages a client may send within MESSAGE_ERROR_WINDOW seconds
+# before it is disconnected with a protocol error
+MAX_MESSAGE_ERRORS = 50
+MESSAGE_ERROR_WINDOW = 1.0
+
+# Inbound JSON control messages, tagged by "type" - decoded straight into
+# these structs; the legacy base64 video_frame/audio_data and text_message
+# all expose their content as .payload
+class _Inbound(msgspec.Struct, frozen=True, tag_field="type"):
+    pass
+
+class VideoFrame(_Inbound, tag="video_frame"):
+    payload: str = msgspec.field(name="data")
+
+class AudioData(_Inbound, tag="audio_data"):
+    payload: str = msgspec.field(name="data")
+
+class TextMessage(_Inbound, tag="text_message"):
+    payload: str = msgspec.field(name="text")
+
+class Ping(_Inbound, tag="ping"):
+    timestamp: Any = None
+
+_decode_inbound = msgspec.json.Decoder(VideoFrame | AudioData | TextMessage | Ping).decode
+
+def _dumps(message) -> str:
+    """Serialize an outgoing WebSocket message - JSON stays on text frames"""
+    return orjson.dumps(message).decode()
+
+# Fixed envelopes, serialized once at import
+_CONNECTED_MSG = _dumps({
+    "type": "connection_status",
+    "status": "connected",
+    "message": "Successfully connected to Gemini AI"
+})
+_INVALID_JSON_MSG = _dumps({
+    "type": "error",
+    "message": "Invalid JSON format"
+})
+
+def _pong(timestamp) -> str:
+    """Pong envelope - integer timestamps skip the JSON encoder entirely"""
+    if type(timestamp) is int:
+        return '{"type":"pong","timestamp":%d}' % timestamp
+    return _dumps({"type": "pong", "timestamp": timestamp})
+
+def _put_latest(target: asyncio.Queue, item) -> None:
+    """Enqueue without waiting, dropping the oldest item when full"""
+    try:
+        target.put_nowait(item)
+    except asyncio.QueueFull:
+        target.get_nowait()
+        target.put_nowait(item)
+
+# Active connections, for /health only - per-connection state stays local
+# to websocket_endpoint. Entries are removed on disconnect; holding the
+# sockets weakly just keeps this map from extending their lifetime
+active_connections: WeakValueDictionary[str, WebSocket] = WeakValueDictionary()
+
+# Gemini sessions kept started ahead of connections - opt-in, since every
+# parked session is a billable Live connection. The size is per worker
+# process, so the total open is GEMINI_POOL_SIZE x WEB_CONCURRENCY
+GEMINI_POOL_SIZE = int(os.environ.get("GEMINI_POOL_SIZE", "0"))
+gemini_pool = GeminiPool(GEMINI_POOL_SIZE)
+
+# Longest the /test endpoint waits on Gemini (seconds)
+GEMINI_TEST_TIMEOUT = 5.0
+
+@app.on_event("startup")
+async def warm_gemini_pool():
+    # Best effort - without credentials or a reachable Gemini the API still
+    # serves, and connections start their own sessions as before
+    await gemini_pool.warmup()
+
+@app.on_event("shutdown")
+async def close_gemini_pool():
+    await gemini_pool.close()
 
 @app.websocket("/ws/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: str):
     await websocket.accept()
-    logger.info(f"Client {client_id} connected")
+    logger.info("Client %s connected", client_id)
     
-    # Create Gemini client for this connection
-    gemini_client = GeminiVideoChat()
-    active_connections[client_id] = {
-        "websocket": websocket,
-        "gemini_client": gemini_client
-    }
+    # Checked once - per-frame logging is debug only
+    debug = logger.isEnabledFor(logging.DEBUG)
+    
+    active_connections[client_id] = websocket
+    gemini_client = None
     
     try:
-        # Start Gemini session
-        await gemini_client.start_session()
-        logger.info(f"Gemini session started for client {client_id}")
+        # Take an already started Gemini session for this connection
+        gemini_client = await gemini_pool.acquire()
+        logger.info("Gemini session started for client %s", client_id)
         
         # Send connection success message
-        await websocket.send_text(json.dumps({
-            "type": "connection_status",
-            "status": "connected",
-            "message": "Successfully connected to Gemini AI"
-        }))
+        await websocket.send_text(_CONNECTED_MSG)
+        
+        # Outbound frames from both handlers, written by write_frames alone -
+        # responses, control envelopes and binary frames are queued separately
+        # so pongs, errors and audio can be dropped without losing a response
+        outbound = asyncio.Queue(OUTBOUND_QUEUE_SIZE)
+        outbound_control = asyncio.Queue(OUTBOUND_CONTROL_SIZE)
+        outbound_binary = asyncio.Queue(OUTBOUND_BINARY_FRAMES)
+        outbound_ready = asyncio.Event()
+        
+        def send(envelope):
+            """Queue a control envelope (pong, error) without waiting"""
+            _put_latest(outbound_control, envelope)
+            outbound_ready.set()
+        
+        def send_binary(frame):
+            """Queue a binary frame, dropping the oldest one if the client is behind"""
+            _put_latest(outbound_binary, frame)
+            outbound_ready.set()
+        
+        # Video and text payloads, forwarded to Gemini by forward_to_gemini
+        video_queue = asyncio.Queue(VIDEO_QUEUE_SIZE)
+        text_queue = asyncio.Queue(TEXT_QUEUE_SIZE)
+        
+        async def queue_video(payload):
+            _put_latest(video_queue, payload)
         
         # Handle incoming messages
         async def handle_messages():
+            # Binary media frames, keyed by opcode
+            binary_handlers = {
+                VIDEO_FRAME_OPCODE: queue_video,
+                AUDIO_DATA_OPCODE: gemini_client.send_audio_data,
+            }
+            # JSON messages with a payload, keyed by struct type
+            json_handlers = {
+                VideoFrame: queue_video,
+                AudioData: gemini_client.send_audio_data,
+                TextMessage: text_queue.put,
+            }
+            # Everything the loop touches per message, bound once
+            receive = websocket.receive
+            decode = _decode_inbound
+            binary_handler = binary_handlers.get
+            json_handler = json_handlers.get
+            ping_opcode = PING_OPCODE
+            pong_prefix = PONG_PREFIX
+            ping = Ping
+            
+            # Invalid messages in the current window
+            clock = asyncio.get_running_loop().time
+            error_count = 0
+            window_start = clock()
+            
+            def too_many_errors():
+                nonlocal error_count, window_start
+                now = clock()
+                if now - window_start > MESSAGE_ERROR_WINDOW:
+                    window_start = now
+                    error_count = 0
+                error_count += 1
+                return error_count > MAX_MESSAGE_ERRORS
+            
             try:
                 while True:
                     try:
-                        data = await websocket.receive_text()
-                        message = json.loads(data)
+                        received = await receive()
+                        if received["type"] == "websocket.disconnect":
+                            raise WebSocketDisconnect(received.get("code", 1000))
                         
-                        if message["type"] == "video_frame":
-                            # Process video frame - pass base64 data directly
-                            await gemini_client.send_video_frame(message["data"])
-                            logger.info(f"Processed video frame from client {client_id}, size: {len(message['data'])} chars")
+                        # Binary frames carry raw media - no JSON or base64 to undo
+                        payload = received.get("bytes")
+                        if payload is not None:
+                            opcode = payload[0] if payload else None
+                            if opcode == ping_opcode:
+                                # Heartbeat - echo the timestamp, no JSON either way
+                                send_binary(pong_prefix + payload[1:])
+                                continue
+                            handler = binary_handler(opcode)
+                            if handler is None:
+                                logger.warning("Unknown binary opcode from client %s: %s", client_id, payload[:1])
+                            else:
+                                # Zero-copy view past the opcode byte
+                                await handler(memoryview(payload)[1:])
+                            continue
                         
-                        elif message["type"] == "audio_data":
-                            # Process audio data - pass the base64 string directly
-                            await gemini_client.send_audio_data(message["data"])
-                            logger.info(f"Processed audio data from client {client_id}, size: {len(message['data'])} chars")
+                        # Text frames carry JSON control messages
+                        message = decode(received["text"])
+                        message_type = type(message)
                         
-                        elif message["type"] == "text_message":
-                            # Process text message
-                            await gemini_client.send_text(message["text"])
-                            logger.info(f"Processed text message from client {client_id}: {message['text']}")
+                        handler = json_handler(message_type)
+                        if handler is not None:
+                            payload = message.payload
+                            await handler(payload)
+                            if debug:
+                                logger.debug("Handled %s from client %s, size: %d chars", message_type.__name__, client_id, len(payload))
                         
-                        elif message["type"] == "ping":
+                        elif message_type is ping:
                             # Handle ping for connection health
-                            await websocket.send_text(json.dumps({
-                                "type": "pong",
-                                "timestamp": message.get("timestamp")
-                            }))
+                            send(_pong(message.timestamp))
                             
-                    except json.JSONDecodeError as e:
-                        logger.error(f"JSON decode error from client {client_id}: {e}")
-                        await websocket.send_text(json.dumps({
-                            "type": "error",
-                            "message": "Invalid JSON format"
-                        }))
+                    except msgspec.ValidationError as e:
+                        # Valid JSON, but an unknown type or missing field
+                        logger.warning("Ignoring invalid message from client %s: %s", client_id, e)
+                        if too_many_errors():
+                            break
+                    except msgspec.DecodeError as e:
+                        logger.error("JSON decode error from client %s: %s", client_id, e)
+                        send(_INVALID_JSON_MSG)
+                        if too_many_errors():
+                            break
+                    except WebSocketDisconnect:
+                        raise
                     except Exception as e:
-                        logger.error(f"Error processing message from client {client_id}: {e}")
+                        logger.error("Error processing message from client %s: %s", client_id, e)
+                
+                # Only reached when the client keeps sending garbage
+                logger.warning("Closing client %s after %d invalid messages", client_id, error_count)
+                await websocket.close(code=1002)
                         
             except WebSocketDisconnect:
-                logger.info(f"Client {client_id} disconnected from message handler")
+                logger.info("Client %s disconnected from message handler", client_id)
             except Exception as e:
-                logger.error(f"Unexpected error in message handler for client {client_id}: {e}")
+                logger.error("Unexpected error in message handler for client %s: %s", client_id, e)
         
         # Handle Gemini responses
         async def handle_responses():
+            put = outbound.put
+            ready = outbound_ready.set
             try:
                 async for response in gemini_client.get_responses():
                     try:
-                        await websocket.send_text(json.dumps({
-                            "type": "response",
-                            "data": response
-                        }))
-                        logger.debug(f"Sent response to client {client_id}")
+                        # Audio goes out as raw PCM in a binary frame, the
+                        # rest of the response as a JSON envelope
+                        audio = response.pop('audio', None)
+                        if audio is not None:
+                            send_binary(AUDIO_RESPONSE_PREFIX + audio)
+                            if debug:
+                                logger.debug("Queued audio response for %s", client_id)
+                        if response:
+                            await put(_dumps({
+                                "type": "response",
+                                "data": response
+                            }))
+                            ready()
+                            if debug:
+                                logger.debug("Queued response for client %s", client_id)
                         
                         # Log specific response types
-                        if 'text' in response:
-                            logger.info(f"Sent text response to {client_id}: {response['text'][:50]}...")
-                        if 'audio' in response:
-                            logger.info(f"Sent audio response to {client_id}")
-                        if 'user_transcription' in response:
-                            logger.info(f"User said: {response['user_transcription']}")
+                        text = response.get('text')
+                        if text:
+                            logger.info("Sent text response to %s: %.50s...", client_id, text)
+                        user_transcription = response.get('user_transcription')
+                        if user_transcription:
+                            logger.info("User said: %s", user_transcription)
                             
                     except Exception as e:
-                        logger.error(f"Error sending response to client {client_id}: {e}")
+                        logger.error("Error sending response to client %s: %s", client_id, e)
                         break
                         
             except Exception as e:
-                logger.error(f"Error in response handler for client {client_id}: {e}")
+                logger.error("Error in response handler for client %s: %s", client_id, e)
         
-        # Run both handlers concurrently
-        await asyncio.gather(
-            handle_messages(),
-            handle_responses()
-        )
+        # Feed one modality's queue to Gemini, one payload at a time
+        async def forward_to_gemini(source, handler):
+            get = source.get
+            while True:
+                payload = await get()
+                try:
+                    await handler(payload)
+                except Exception as e:
+                    logger.error("Error forwarding to Gemini for client %s: %s", client_id, e)
+        
+        # Write queued frames, batching whatever piled up since the last send
+        async def write_frames():
+            get_control = outbound_control.get_nowait
+            no_control = outbound_control.empty
+            get_envelope = outbound.get_nowait
+            no_envelopes = outbound.empty
+            get_binary = outbound_binary.get_nowait
+            no_binary = outbound_binary.empty
+            wait = outbound_ready.wait
+            clear = outbound_ready.clear
+            send_text = websocket.send_text
+            send_bytes = websocket.send_bytes
+            texts = []
+            try:
+                while True:
+                    await wait()
+                    clear()
+                    
+                    # JSON envelopes share one newline-delimited text frame
+                    while len(texts) < OUTBOUND_BATCH_SIZE and not no_control():
+                        texts.append(get_control())
+                    while len(texts) < OUTBOUND_BATCH_SIZE and not no_envelopes():
+                        texts.append(get_envelope())
+                    if texts:
+                        await send_text("\n".join(texts))
+                        texts.clear()
+                    
+                    # Binary frames go out on their own, in order
+                    for _ in range(OUTBOUND_BATCH_SIZE):
+                        if no_binary():
+                            break
+                        await send_bytes(get_binary())
+                    
+                    # Come back for anything past this batch
+                    if not no_control() or not no_envelopes() or not no_binary():
+                        outbound_ready.set()
+                        
+            except Exception as e:
+                logger.error("Error writing to client %s: %s", client_id, e)
+        
+        # Run the handlers, writer and Gemini forwarders concurrently - the
+        # handlers return once their side of the connection is gone, so the
+        # first task to finish cancels the rest
+        async with asyncio.TaskGroup() as tg:
+            tasks = [
+                tg.create_task(handle_messages()),
+                tg.create_task(handle_responses()),
+                tg.create_task(write_frames()),
+                tg.create_task(forward_to_gemini(video_queue, gemini_client.send_video_frame)),
+                tg.create_task(forward_to_gemini(text_queue, gemini_client.send_text)),
+            ]
+            def cancel_all(_):
+                for task in tasks:
+                    task.cancel()
+            for task in tasks:
+                task.add_done_callback(cancel_all)
         
     except WebSocketDisconnect:
-        logger.info(f"WebSocket disconnected for client {client_id}")
+        logger.info("WebSocket disconnected for client %s", client_id)
     except Exception as e:
-        logger.error(f"WebSocket error for client {client_id}: {e}")
-        traceback.print_exc()
+        logger.exception("WebSocket error for client %s: %s", client_id, e)
         try:
-            await websocket.send_text(json.dumps({
+            await websocket.send_text(_dumps({
                 "type": "error",
                 "message": f"Server error: {str(e)}"
             }))
         except:
             pass
     finally:
-        # Cleanup
-        if client_id in active_connections:
+        # Cleanup - a reconnect under the same id may already own the entry
+        if active_connections.get(client_id) is websocket:
+            del active_connections[client_id]
+        if gemini_client is not None:
             try:
-                await active_connections[client_id]["gemini_client"].cleanup()
-                logger.info(f"Cleaned up client {client_id}")
+                await gemini_pool.release(gemini_client)
+                logger.info("Cleaned up client %s", client_id)
             except Exception as e:
-                logger.error(f"Error during cleanup for client {client_id}: {e}")
-            finally:
-                del active_connections[client_id]
+                logger.error("Error during cleanup for client %s: %s", client_id, e)
 
 @app.get("/")
 async def root():
@@ -168,8 +454,11 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    # Connections are tracked per worker process - with WEB_CONCURRENCY > 1
+    # this covers only the worker that answered, identified by "worker"
     return {
         "status": "healthy",
+        "worker": os.getpid(),
         "active_connections": len(active_connections),
         "connection_ids": list(active_connections.keys())
     }
@@ -178,19 +467,31 @@ async def health_check():
 async def test_gemini():
     """Test endpoint to verify Gemini connection"""
     try:
-        from gemini_client import test_gemini_client
-        await test_gemini_client()
+        await asyncio.wait_for(
+            test_gemini_client(gemini_pool.client), timeout=GEMINI_TEST_TIMEOUT
+        )
         return {"status": "success", "message": "Gemini connection test passed"}
+    except asyncio.TimeoutError:
+        return {"status": "error", "message": f"Gemini connection test timed out after {GEMINI_TEST_TIMEOUT}s"}
     except Exception as e:
         return {"status": "error", "message": f"Gemini connection test failed: {str(e)}"}
 
 if __name__ == "__main__":
     import uvicorn
     logger.info("Starting Video Chat API server...")
+    # Reload only when asked for (DEV_RELOAD=1/true/yes). Otherwise run
+    # WEB_CONCURRENCY worker processes, one per core by default - each has
+    # its own connections and Gemini pool, so /health reports one worker
+    reload = os.environ.get("DEV_RELOAD", "").strip().lower() in {"1", "true", "yes"}
+    workers = int(os.environ.get("WEB_CONCURRENCY") or os.cpu_count() or 1)
     uvicorn.run(
         "main:app",
         host="0.0.0.0", 
         port=8000,
-        log_level="info",
-        reload=True
+        loop="uvloop",
+        http="httptools",
+        ws="websockets",
+        log_level="warning",
+        reload=reload,
+        workers=None if reload else workers
     )
\ No newline at end of file
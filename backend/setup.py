@@ -0,0 +1,9 @@
+"""Optional build of the compiled frame encoder: python setup.py build_ext --inplace"""
+
+from setuptools import setup
+from Cython.Build import cythonize
+
+setup(
+    name="frame-encoder",
+    ext_modules=cythonize("frame_encoder.py", language_level=3),
+)
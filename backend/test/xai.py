@@ -66,20 +66,20 @@ class AudioLoop:
 
     # Video Frame Capture (_get_frame, get_frames)
 
-    # Captures a frame from the webcam, converts it to RGB, resizes, encodes as JPEG, and base64-encodes it for API compatibility.
+    # Captures a frame from the webcam, resizes, encodes as JPEG straight from OpenCV's BGR frame (no RGB conversion), and base64-encodes it for API compatibility.
     def _get_frame(self, cap):
         ret, frame = cap.read()
         if not ret:
             return None
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        img = PIL.Image.fromarray(frame_rgb)
-        img.thumbnail([1024, 1024])
-        image_io = io.BytesIO()
-        img.save(image_io, format="jpeg")
-        image_io.seek(0)
+        height, width = frame.shape[:2]
+        scale = 1024 / max(height, width)
+        if scale < 1:
+            frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 65])
+        if not ok:
+            return None
         mime_type = "image/jpeg"
-        image_bytes = image_io.read()
-        return {"mime_type": mime_type, "data": base64.b64encode(image_bytes).decode()}
+        return {"mime_type": mime_type, "data": base64.b64encode(buf.tobytes()).decode()}
 
     # Runs in a loop, capturing frames every second and putting them into the output queue
     async def get_frames(self):
@@ -101,7 +101,7 @@ class AudioLoop:
         image_bytes = mss.tools.to_png(i.rgb, i.size)
         img = PIL.Image.open(io.BytesIO(image_bytes))
         image_io = io.BytesIO()
-        img.save(image_io, format="jpeg")
+        img.save(image_io, format="jpeg", quality=65, optimize=False, progressive=False, subsampling=2)
         image_io.seek(0)
         image_bytes = image_io.read()
         return {"mime_type": mime_type, "data": base64.b64encode(image_bytes).decode()}
@@ -222,4 +222,9 @@ if __name__ == "__main__":
     )
     args = parser.parse_args()
     main = AudioLoop(video_mode=args.mode)
-    asyncio.run(main.run())
\ No newline at end of file
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(main.run())
+    else:
+        uvloop.run(main.run())
\ No newline at end of file
@@ -63,4 +63,9 @@ async def test_connection():
 
 if __name__ == "__main__":
     print("Testing Gemini connection...")
-    asyncio.run(test_connection())
\ No newline at end of file
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(test_connection())
+    else:
+        uvloop.run(test_connection())
\ No newline at end of file
@@ -1,6 +1,24 @@
 import React, { useState, useRef, useEffect, useCallback } from 'react';
 import { Mic, MicOff, Video, VideoOff, Phone, PhoneOff } from 'lucide-react';
 
+// Opcodes in the first byte of binary WebSocket frames, followed by the raw
+// payload - must match backend/main.py
+const VIDEO_FRAME_OPCODE = 0x01; // JPEG bytes
+const AUDIO_DATA_OPCODE = 0x02; // 16-bit PCM bytes
+const PING_OPCODE = 0x50; // 'P' + little-endian uint64 timestamp
+const AUDIO_RESPONSE_OPCODE = 0x10; // Gemini's 24 kHz 16-bit PCM, server to client
+const PONG_OPCODE = 0x70; // 'p' + the ping's timestamp, echoed back
+
+const HEARTBEAT_INTERVAL_MS = 10000;
+
+// Binary heartbeat frame carrying the send time
+const pingFrame = () => {
+  const frame = new DataView(new ArrayBuffer(9));
+  frame.setUint8(0, PING_OPCODE);
+  frame.setBigUint64(1, BigInt(Date.now()), true);
+  return frame.buffer;
+};
+
 // WebSocket Hook
 const useWebSocket = (url, onMessage) => {
   const [socket, setSocket] = useState(null);
@@ -8,6 +26,7 @@ const useWebSocket = (url, onMessage) => {
   const connectionReadyRef = useRef(false);
   const connectionAttemptRef = useRef(false);
   const reconnectTimeoutRef = useRef(null);
+  const heartbeatIntervalRef = useRef(null);
 
   useEffect(() => {
     if (!url || connectionAttemptRef.current) return;
@@ -18,6 +37,7 @@ const useWebSocket = (url, onMessage) => {
     const connectWebSocket = () => {
       try {
         const ws = new WebSocket(url);
+        ws.binaryType = 'arraybuffer';
         
         ws.onopen = () => {
           console.log('WebSocket connected successfully');
@@ -35,12 +55,36 @@ const useWebSocket = (url, onMessage) => {
           setTimeout(() => {
             connectionReadyRef.current = true;
           }, 1500);
+          
+          // Keep the connection alive with binary pings
+          clearInterval(heartbeatIntervalRef.current);
+          heartbeatIntervalRef.current = setInterval(() => {
+            if (ws.readyState === WebSocket.OPEN) {
+              ws.send(pingFrame());
+            }
+          }, HEARTBEAT_INTERVAL_MS);
         };
         
         ws.onmessage = (event) => {
           try {
-            const data = JSON.parse(event.data);
-            onMessage(data);
+            // Binary frames carry raw media: opcode byte + payload
+            if (event.data instanceof ArrayBuffer) {
+              const opcode = new Uint8Array(event.data, 0, 1)[0];
+              if (opcode === AUDIO_RESPONSE_OPCODE) {
+                onMessage({ type: 'audio', data: event.data.slice(1) });
+              } else if (opcode === PONG_OPCODE) {
+                const sentAt = Number(new DataView(event.data).getBigUint64(1, true));
+                console.debug('Heartbeat round trip:', Date.now() - sentAt, 'ms');
+              } else {
+                console.warn('Unknown binary opcode:', opcode);
+              }
+              return;
+            }
+            
+            // Text frames carry one or more newline-delimited JSON envelopes
+            for (const line of event.data.split('\n')) {
+              onMessage(JSON.parse(line));
+            }
           } catch (error) {
             console.error('Error parsing WebSocket message:', error);
           }
@@ -48,6 +92,8 @@ const useWebSocket = (url, onMessage) => {
         
         ws.onclose = (event) => {
           console.log('WebSocket disconnected', event.code, event.reason);
+          clearInterval(heartbeatIntervalRef.current);
+          heartbeatIntervalRef.current = null;
           setIsConnected(false);
           connectionReadyRef.current = false;
           setSocket(null);
@@ -84,6 +130,9 @@ const useWebSocket = (url, onMessage) => {
       connectionReadyRef.current = false;
       connectionAttemptRef.current = false;
       
+      clearInterval(heartbeatIntervalRef.current);
+      heartbeatIntervalRef.current = null;
+      
       if (reconnectTimeoutRef.current) {
         clearTimeout(reconnectTimeoutRef.current);
         reconnectTimeoutRef.current = null;
@@ -108,7 +157,21 @@ const useWebSocket = (url, onMessage) => {
     return false;
   }, [socket]);
 
-  return { socket, isConnected, sendMessage };
+  // Send raw media as a binary frame: opcode byte + payload (Blob or buffer)
+  const sendBinary = useCallback((opcode, payload) => {
+    if (socket && socket.readyState === WebSocket.OPEN && connectionReadyRef.current) {
+      try {
+        socket.send(new Blob([Uint8Array.of(opcode), payload]));
+        return true;
+      } catch (error) {
+        console.error('Error sending binary message:', error);
+        return false;
+      }
+    }
+    return false;
+  }, [socket]);
+
+  return { socket, isConnected, sendMessage, sendBinary };
 };
 
 // Animated Orb Component
@@ -228,7 +291,7 @@ const VideoChat = () => {
   }
   
   // WebSocket connection
-  const { isConnected, sendMessage } = useWebSocket(
+  const { isConnected, sendMessage, sendBinary } = useWebSocket(
     isActive ? `ws://localhost:8000/ws/${clientIdRef.current}` : null,
     useCallback((data) => {
       console.log('Received message:', data);
@@ -254,10 +317,10 @@ const VideoChat = () => {
         if (response.transcription) {
           setCurrentResponse(response.transcription);
         }
-        
-        if (response.audio) {
-          playAudioResponse(response.audio);
-        }
+      }
+      
+      if (data.type === 'audio') {
+        playAudioResponse(data.data);
       }
     }, [])
   );
@@ -271,9 +334,9 @@ const VideoChat = () => {
   }, [isConnected]);
 
   // Play audio response from AI with queue to prevent overlapping
-  const playAudioResponse = async (audioBase64) => {
+  const playAudioResponse = async (pcmBuffer) => {
     // Add to queue
-    audioQueueRef.current.push(audioBase64);
+    audioQueueRef.current.push(pcmBuffer);
     
     // If already playing, just queue it
     if (isPlayingAudioRef.current) {
@@ -293,17 +356,10 @@ const VideoChat = () => {
     isPlayingAudioRef.current = true;
     
     while (audioQueueRef.current.length > 0) {
-      const audioBase64 = audioQueueRef.current.shift();
+      const pcmBuffer = audioQueueRef.current.shift();
       
       try {
-        console.log('🎵 Playing audio chunk, base64 length:', audioBase64.length);
-        
-        // Decode base64 audio data
-        const audioData = atob(audioBase64);
-        const audioArray = new Uint8Array(audioData.length);
-        for (let i = 0; i < audioData.length; i++) {
-          audioArray[i] = audioData.charCodeAt(i);
-        }
+        console.log('🎵 Playing audio chunk, bytes:', pcmBuffer.byteLength);
         
         // Create or resume audio context
         if (!audioContextRef.current || audioContextRef.current.state === 'closed') {
@@ -320,7 +376,7 @@ const VideoChat = () => {
         }
         
         // For raw PCM data from Gemini (16-bit PCM at 24kHz)
-        const int16Array = new Int16Array(audioArray.buffer);
+        const int16Array = new Int16Array(pcmBuffer, 0, pcmBuffer.byteLength >> 1);
         const float32Array = new Float32Array(int16Array.length);
         
         // Convert 16-bit PCM to Float32Array
@@ -594,16 +650,10 @@ const VideoChat = () => {
             pcmData[i] = s < 0 ? s * 0x8000 : s * 0x7FFF;
           }
           
-          // Convert to base64 and send
-          const uint8Array = new Uint8Array(pcmData.buffer);
-          const base64Audio = btoa(String.fromCharCode(...uint8Array));
-          
-          sendMessage({
-            type: 'audio_data',
-            data: base64Audio
-          });
+          // Send raw PCM bytes as a binary frame
+          sendBinary(AUDIO_DATA_OPCODE, pcmData.buffer);
           
-          console.log('📤 Audio data sent, length:', base64Audio.length);
+          console.log('📤 Audio data sent, bytes:', pcmData.byteLength);
           
           // Clear buffer
           audioBuffer = [];
@@ -669,20 +719,13 @@ const VideoChat = () => {
           
           canvas.toBlob((blob) => {
             if (blob) {
-              const reader = new FileReader();
-              reader.onload = () => {
-                const base64 = reader.result.split(',')[1];
-                sendMessage({
-                  type: 'video_frame',
-                  data: base64
-                });
-                console.log('📤 Video frame sent, size:', base64.length, 'chars');
-              };
-              reader.readAsDataURL(blob);
+              // Send the JPEG bytes as a binary frame
+              sendBinary(VIDEO_FRAME_OPCODE, blob);
+              console.log('📤 Video frame sent, size:', blob.size, 'bytes');
             } else {
               console.error('❌ Failed to create blob from canvas');
             }
-          }, 'image/jpeg', 0.8);
+          }, 'image/jpeg', 0.65); // Frames that fit 1024px are forwarded to Gemini as-is
         } catch (error) {
           console.error('❌ Error capturing frame:', error);
         }